@@ -6,26 +6,46 @@ Handles .env files and JSON config files
 
 import os
 import json
+import functools
 from pathlib import Path
 from typing import Any, Optional
 from dotenv import load_dotenv
 
+# Sentinel for config keys that resolve to nothing
+_MISSING = object()
+
+
+# .env files already loaded, keyed by resolved path (None = dotenv default search)
+_ENV_LOADED: dict[Optional[Path], bool] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def _find_env_file(start: Path) -> Optional[Path]:
+    """Find .env in start dir or parent dirs"""
+    current = start
+    for _ in range(5):  # Check up to 5 levels
+        env_file = current / ".env"
+        if env_file.exists():
+            return env_file.resolve()
+        current = current.parent
+    return None
+
 
 def load_env(env_path: Optional[Path] = None) -> None:
     """Load environment variables from .env file"""
     if env_path:
-        load_dotenv(env_path)
+        env_file = Path(env_path).resolve()
     else:
         # Try to find .env in current dir or parent dirs
-        current = Path.cwd()
-        for _ in range(5):  # Check up to 5 levels
-            env_file = current / ".env"
-            if env_file.exists():
-                load_dotenv(env_file)
-                return
-            current = current.parent
-        # Fallback to default dotenv behavior
-        load_dotenv()
+        env_file = _find_env_file(Path.cwd())
+
+    # Each file is only parsed once per process
+    if _ENV_LOADED.get(env_file):
+        return
+
+    # Fallback to default dotenv behavior when no file was found
+    load_dotenv(env_file)
+    _ENV_LOADED[env_file] = True
 
 
 def get_env(key: str, default: Optional[str] = None, required: bool = False) -> Optional[str]:
@@ -48,14 +68,33 @@ def load_json_config(config_path: Path) -> dict[str, Any]:
 def merge_configs(base: dict, override: dict) -> dict:
     """Deep merge two configuration dictionaries"""
     result = base.copy()
-    for key, value in override.items():
-        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-            result[key] = merge_configs(result[key], value)
-        else:
-            result[key] = value
+    stack = [(result, override)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            if key in target and isinstance(target[key], dict) and isinstance(value, dict):
+                # Only the sub-dicts merged into are copied; base stays untouched
+                target[key] = target[key].copy()
+                stack.append((target[key], value))
+            else:
+                target[key] = value
     return result
 
 
+def _flatten_config(config: dict, prefix: str = "") -> dict[str, Any]:
+    """Flatten nested config into dotted keys (e.g., "wordpress.url")"""
+    flat = {}
+    for key, value in config.items():
+        if not isinstance(value, dict):
+            continue
+        for sub_key, sub_value in value.items():
+            # None leaves fall through to env vars, as with a failed nested lookup
+            if sub_value is not None:
+                flat[f"{prefix}{key}.{sub_key}"] = sub_value
+        flat.update(_flatten_config(value, f"{prefix}{key}."))
+    return flat
+
+
 class SkillConfig:
     """Base configuration class for skills"""
 
@@ -70,32 +109,28 @@ class SkillConfig:
         if config_path and config_path.exists():
             self._config = load_json_config(config_path)
 
-    def get(self, key: str, default: Any = None) -> Any:
-        """Get config value, checking JSON config first, then env vars"""
-        # Check nested keys (e.g., "wordpress.url")
-        if "." in key:
-            parts = key.split(".")
-            value = self._config
-            for part in parts:
-                if isinstance(value, dict) and part in value:
-                    value = value[part]
-                else:
-                    value = None
-                    break
-            if value is not None:
-                return value
-
-        # Check flat key in config
-        if key in self._config:
-            return self._config[key]
+        # Resolve nested keys once; nested values take precedence over flat keys
+        self._flat: dict[str, Any] = {**self._config, **_flatten_config(self._config)}
+        # Config is static after load, so lookups are memoized per instance
+        # (clear this cache if a setter is ever added)
+        self._resolve = functools.lru_cache(maxsize=None)(self._resolve_key)
+
+    def _resolve_key(self, key: str) -> Any:
+        """Resolve a key from JSON config, then env vars"""
+        if key in self._flat:
+            return self._flat[key]
 
         # Check environment variable (convert key to ENV_VAR format)
-        env_key = key.upper().replace(".", "_")
-        env_value = os.getenv(env_key)
+        env_value = os.getenv(key.upper().replace(".", "_"))
         if env_value is not None:
             return env_value
 
-        return default
+        return _MISSING
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get config value, checking JSON config first, then env vars"""
+        value = self._resolve(key)
+        return default if value is _MISSING else value
 
     def require(self, key: str) -> Any:
         """Get required config value, raise error if not found"""
@@ -3,29 +3,204 @@
 Shared utilities for Claude Content Skills
 """
 
+import os
+import re
+import sys
 import json
+import mmap
+import atexit
 import hashlib
+import dataclasses
 from pathlib import Path
+from html import unescape
 from datetime import datetime
 from typing import Any, Optional
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+
+try:
+    from lxml import etree
+    # Compiled once per process instead of re-parsing the expression per page
+    _HREF_XPATH = etree.XPath('//*[@href]')
+    # Without an explicit encoding libxml2 reads pages lacking <meta charset>
+    # as Latin-1; decode as UTF-8 like the other parsers do
+    _HTML_PARSER = etree.HTMLParser(encoding='utf-8')
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+def _json_default(obj: Any) -> Any:
+    """Serialize dataclasses as dicts and anything else unknown as a string"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
 
 def save_json(data: Any, path: Path, indent: int = 2) -> None:
     """Save data to JSON file"""
+    # orjson only supports 2-space indentation; other widths use stdlib json
+    if ORJSON_AVAILABLE and indent in (2, None):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        # orjson serializes dataclasses natively, so _json_default rarely runs here
+        path.write_bytes(orjson.dumps(data, option=option, default=_json_default))
+        return
+
     with open(path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=indent, ensure_ascii=False, default=str)
+        json.dump(data, f, indent=indent, ensure_ascii=False, default=_json_default)
+
+
+# Below this many nested entries stream_json just pretty-prints with save_json
+STREAM_JSON_MIN_ENTRIES = 10_000
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode one JSON value compactly"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS, default=_json_default)
+    return json.dumps(obj, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def stream_json(data: dict[str, Any], path: Path) -> None:
+    """Save a dict of result sections to JSON, writing large maps one entry per line"""
+    # Encoding a huge result in one call builds the whole document in memory
+    # on top of the data itself; per-entry output only ever holds one entry
+    if sum(len(v) for v in data.values() if isinstance(v, dict)) < STREAM_JSON_MIN_ENTRIES:
+        save_json(data, path)
+        return
+
+    with open(path, 'wb', buffering=1 << 16) as f:
+        f.write(b"{")
+        for i, (key, value) in enumerate(data.items()):
+            f.write(b",\n  " if i else b"\n  ")
+            f.write(_dumps(key) + b": ")
+            if not isinstance(value, dict):
+                f.write(_dumps(value))
+                continue
+            f.write(b"{")
+            for j, (k, v) in enumerate(value.items()):
+                f.write(b",\n    " if j else b"\n    ")
+                f.write(_dumps(k if isinstance(k, str) else str(k)) + b": " + _dumps(v))
+            f.write(b"\n  }" if value else b"}")
+        f.write(b"\n}\n")
+
+
+def print_json(data: Any) -> None:
+    """Write data to stdout as indented JSON"""
+    if ORJSON_AVAILABLE:
+        # Encode in C and hand the bytes straight to stdout's buffer
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(
+            data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE,
+            default=_json_default
+        ))
+        sys.stdout.buffer.flush()
+        return
+
+    json.dump(data, sys.stdout, indent=2, default=_json_default)
+    sys.stdout.write("\n")
 
 
 def load_json(path: Path) -> Any:
     """Load data from JSON file"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(path.read_bytes())
+
     with open(path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 
+# Files larger than this are hashed through mmap instead of buffered reads
+MMAP_HASH_THRESHOLD = 1 << 20
+
+
 def file_hash(path: Path) -> str:
-    """Calculate MD5 hash of file content"""
+    """Calculate BLAKE2b hash of file content without reading it all into memory"""
     with open(path, 'rb') as f:
-        return hashlib.md5(f.read()).hexdigest()
+        # Large files: hash straight from the page cache in a single call
+        # (zero-length files can't be mapped, so they never take this path)
+        if os.fstat(f.fileno()).st_size > MMAP_HASH_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                h = hashlib.blake2b()
+                h.update(mm)
+                return h.hexdigest()
+
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'blake2b').hexdigest()
+
+        h = hashlib.blake2b()
+        while chunk := f.read(1 << 18):
+            h.update(chunk)
+        return h.hexdigest()
+
+
+# Tag name and href of any tag, double-quoted, single-quoted or bare
+_HREF_RE = re.compile(
+    rb"""<([a-z][^\s/>]*)\s(?:[^>]*?\s)?href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE
+)
+
+
+def link_parser_name(accurate: bool = False) -> str:
+    """Name the backend parse_links uses, so cached results can be tied to it"""
+    if SELECTOLAX_AVAILABLE:
+        return 'selectolax'
+    if LXML_AVAILABLE:
+        return 'lxml'
+    return 'bs4' if accurate else 'regex'
+
+
+def parse_links(html: bytes | mmap.mmap, accurate: bool = False) -> tuple[list[str], list[str]]:
+    """Extract hrefs from raw HTML bytes (or an mmap of them) as (<a> hrefs, other tags' hrefs)"""
+    # Only <a> tags are links between pages, but <link rel="canonical">,
+    # <area> and the like still point at URLs that have to exist
+    anchors: list[str] = []
+    others: list[str] = []
+
+    if SELECTOLAX_AVAILABLE:
+        # selectolax only takes bytes/str; lxml and the regex read buffers directly
+        if not isinstance(html, bytes):
+            html = bytes(html)
+        for node in HTMLParser(html).css('[href]'):
+            # Valueless attributes (<a href>) come back as None
+            (anchors if node.tag == 'a' else others).append(node.attributes.get('href') or '')
+        return anchors, others
+
+    if LXML_AVAILABLE:
+        root = etree.fromstring(html, _HTML_PARSER)
+        if root is not None:
+            for element in _HREF_XPATH(root):
+                (anchors if element.tag == 'a' else others).append(element.get('href'))
+        return anchors, others
+
+    # Without a C parser, a regex over the raw bytes beats building a tree in
+    # pure Python; it can't tell markup from comments or scripts, hence accurate
+    if not accurate:
+        for tag, *values in _HREF_RE.findall(html):
+            href = unescape((values[0] or values[1] or values[2]).decode('utf-8', errors='ignore'))
+            (anchors if tag.lower() == b'a' else others).append(href)
+        return anchors, others
+
+    # Accurate pure-Python path: only build tree nodes for tags with an href, not the whole DOM
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(
+        str(html, 'utf-8', errors='ignore'), 'html.parser',
+        parse_only=SoupStrainer(href=True)
+    )
+    for tag in soup.find_all(href=True):
+        (anchors if tag.name == 'a' else others).append(tag['href'])
+    return anchors, others
 
 
 def timestamp() -> str:
@@ -47,74 +222,170 @@ def ensure_dir(path: Path) -> Path:
 
 
 class ProgressTracker:
-    """Track progress for resumable operations"""
+    """Track progress for resumable operations
+
+    State changes are appended to a journal (``<state_file>.log``) as one
+    JSON line each and replayed on load. The full state is only rewritten
+    when the journal is compacted.
+    """
+
+    # Bounds for the adaptive number of events between compactions (x8)
+    MIN_FLUSH_EVERY = 1
+    MAX_FLUSH_EVERY = 256
 
-    def __init__(self, state_file: Path):
+    def __init__(self, state_file: Path, flush_every: int = 32):
         self.state_file = state_file
+        self.log_file = state_file.with_suffix('.log')
+        self._flush_every = flush_every
+        self._dirty = 0
+        self._log = None
         self.state: dict[str, Any] = self._load_state()
+        self._seq: int = self.state.get("journal_seq", 0)
+        # Compact any journaled events when the process exits
+        atexit.register(self.flush)
 
     def _load_state(self) -> dict[str, Any]:
-        """Load state from file"""
+        """Load state from file and replay the journal on top of it"""
         if self.state_file.exists():
-            return load_json(self.state_file)
+            state = load_json(self.state_file)
+        else:
+            state = {
+                "started_at": None,
+                "last_updated": None,
+                "completed": [],
+                "failed": [],
+                "pending": [],
+                "current": None,
+                "metadata": {}
+            }
+
+        # Sets give O(1) membership and removal; persisted as sorted lists
+        state["pending"] = set(state["pending"])
+        state["completed"] = set(state["completed"])
+
+        if self.log_file.exists():
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written last line from an interrupted run
+                        continue
+                    # Events already folded into the snapshot are skipped
+                    if event["seq"] > state.get("journal_seq", 0):
+                        self._apply_event(state, event)
+                        self._dirty += 1
+
+        return state
+
+    @staticmethod
+    def _apply_event(state: dict[str, Any], event: dict[str, Any]) -> None:
+        """Apply a journaled state change"""
+        op = event["op"]
+        item = event["item"]
+
+        if op == "current":
+            state["current"] = item
+            state["pending"].discard(item)
+        elif op == "complete":
+            state["completed"].add(item)
+            state["current"] = None
+        elif op == "fail":
+            state["failed"].append({
+                "item": item,
+                "error": event.get("error"),
+                "timestamp": event["ts"]
+            })
+            state["current"] = None
+
+        state["last_updated"] = event["ts"]
+        state["journal_seq"] = event["seq"]
+
+    def _record(self, op: str, item: str, **fields: Any) -> None:
+        """Apply a state change and append it to the journal"""
+        self._seq += 1
+        event = {"op": op, "item": item, "ts": timestamp(), "seq": self._seq, **fields}
+        self._apply_event(self.state, event)
+
+        if self._log is None:
+            ensure_dir(self.log_file.parent)
+            self._log = open(self.log_file, 'a', encoding='utf-8', buffering=1)
+        self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+        self._dirty += 1
+        self._adapt_flush_every()
+        if self._dirty >= self._flush_every * 8:
+            self.save()
+
+    def _adapt_flush_every(self) -> None:
+        """Compact less often while many items remain, more often near the end"""
+        pending = len(self.state["pending"])
+        if pending > self._flush_every * 8:
+            self._flush_every = min(self._flush_every * 2, self.MAX_FLUSH_EVERY)
+        elif pending < self._flush_every:
+            self._flush_every = max(pending, self.MIN_FLUSH_EVERY)
+
+    def _serialize_state(self) -> dict[str, Any]:
+        """Get state in its JSON form, with sets as sorted lists"""
         return {
-            "started_at": None,
-            "last_updated": None,
-            "completed": [],
-            "failed": [],
-            "pending": [],
-            "current": None,
-            "metadata": {}
+            **self.state,
+            "pending": sorted(self.state["pending"]),
+            "completed": sorted(self.state["completed"])
         }
 
     def save(self) -> None:
-        """Save current state to file"""
+        """Atomically write the full state to file and truncate the journal"""
         self.state["last_updated"] = timestamp()
+        self.state["journal_seq"] = self._seq
         ensure_dir(self.state_file.parent)
-        save_json(self.state, self.state_file)
+
+        tmp_file = self.state_file.with_suffix(self.state_file.suffix + '.tmp')
+        save_json(self._serialize_state(), tmp_file)
+        os.replace(tmp_file, self.state_file)
+
+        # Every journaled event is now part of the snapshot
+        if self._log is not None:
+            self._log.truncate(0)
+        elif self.log_file.exists():
+            self.log_file.unlink()
+        self._dirty = 0
+
+    def flush(self) -> None:
+        """Compact journaled events into the state file"""
+        if self._dirty:
+            self.save()
 
     def start(self, items: list[str]) -> None:
         """Start tracking a new batch of items"""
         self.state["started_at"] = timestamp()
-        self.state["pending"] = items
-        self.state["completed"] = []
+        self.state["pending"] = set(items)
+        self.state["completed"] = set()
         self.state["failed"] = []
         self.state["current"] = None
         self.save()
 
     def mark_current(self, item: str) -> None:
         """Mark item as currently being processed"""
-        self.state["current"] = item
-        if item in self.state["pending"]:
-            self.state["pending"].remove(item)
-        self.save()
+        self._record("current", item)
 
     def mark_completed(self, item: str) -> None:
         """Mark item as completed"""
-        if item not in self.state["completed"]:
-            self.state["completed"].append(item)
-        self.state["current"] = None
-        self.save()
+        self._record("complete", item)
 
     def mark_failed(self, item: str, error: Optional[str] = None) -> None:
         """Mark item as failed"""
-        self.state["failed"].append({
-            "item": item,
-            "error": error,
-            "timestamp": timestamp()
-        })
-        self.state["current"] = None
-        self.save()
+        self._record("fail", item, error=error)
 
     def get_remaining(self) -> list[str]:
         """Get list of items still pending"""
-        remaining = self.state["pending"].copy()
+        remaining = sorted(self.state["pending"])
         if self.state["current"]:
             remaining.insert(0, self.state["current"])
         return remaining
 
     def is_complete(self) -> bool:
         """Check if all items are processed"""
+        self.flush()
         return len(self.state["pending"]) == 0 and self.state["current"] is None
 
     def get_stats(self) -> dict[str, int]:
@@ -131,9 +402,9 @@ class ProgressTracker:
         self.state = {
             "started_at": None,
             "last_updated": None,
-            "completed": [],
+            "completed": set(),
             "failed": [],
-            "pending": [],
+            "pending": set(),
             "current": None,
             "metadata": {}
         }
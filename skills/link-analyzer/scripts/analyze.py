@@ -12,19 +12,21 @@ from datetime import datetime
 # Add shared modules to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
 from config_loader import load_json_config
-from utils import save_json, ensure_dir, timestamp
+from utils import save_json, stream_json, ensure_dir, timestamp
 
 # Import analysis modules
 from outbound_links import OutboundLinksAnalyzer
 from internal_links import InternalLinksChecker
 from link_graph import LinkGraphAnalyzer, generate_markdown_report as generate_graph_report
+from dist_scanner import scan_dist
 
 
 def run_full_analysis(
     dist_path: Path,
     config: dict,
     output_dir: Path,
-    skip_http: bool = False
+    skip_http: bool = False,
+    accurate: bool = False
 ) -> dict:
     """Run all analysis components"""
 
@@ -50,17 +52,34 @@ def run_full_analysis(
 
     ensure_dir(output_dir)
 
+    outbound_analyzer = OutboundLinksAnalyzer(dist_path, internal_domains)
+    internal_checker = InternalLinksChecker(dist_path, excluded_paths=excluded_paths)
+    graph_analyzer = LinkGraphAnalyzer(dist_path, excluded_paths=excluded_paths)
+
+    # Phases 1-3 share a single walk and parse of the HTML files
+    print("\n" + "=" * 60)
+    print("SCANNING HTML FILES")
+    print("=" * 60)
+
+    for file_path, hrefs, other_hrefs in scan_dist(
+        dist_path, cache_path=output_dir / ".link_cache.json", accurate=accurate
+    ):
+        # Only <a> tags are outbound or graph links; the internal checker
+        # also validates the URLs of <link>, <area> and other tags
+        outbound_analyzer.ingest(file_path, hrefs)
+        internal_checker.ingest(file_path, hrefs, other_hrefs)
+        graph_analyzer.ingest(file_path, hrefs)
+
     # 1. Outbound Links Analysis
     print("\n" + "=" * 60)
     print("PHASE 1: Outbound Links Analysis")
     print("=" * 60)
 
-    outbound_analyzer = OutboundLinksAnalyzer(dist_path, internal_domains)
-    outbound_results = outbound_analyzer.analyze()
+    outbound_results = outbound_analyzer.get_results()
     results["outbound"] = outbound_results["metadata"]
 
     outbound_file = output_dir / "outbound_links.json"
-    save_json(outbound_results, outbound_file)
+    stream_json(outbound_results, outbound_file)
     print(f"Saved to: {outbound_file}")
 
     # 2. Internal Links Check
@@ -68,8 +87,7 @@ def run_full_analysis(
     print("PHASE 2: Internal Links Check")
     print("=" * 60)
 
-    internal_checker = InternalLinksChecker(dist_path, excluded_paths=excluded_paths)
-    internal_results = internal_checker.analyze()
+    internal_results = internal_checker.get_results()
     results["internal"] = internal_results["metadata"]
 
     internal_file = output_dir / "internal_links.json"
@@ -81,8 +99,7 @@ def run_full_analysis(
     print("PHASE 3: Link Graph Analysis")
     print("=" * 60)
 
-    graph_analyzer = LinkGraphAnalyzer(dist_path, excluded_paths=excluded_paths)
-    graph_results = graph_analyzer.analyze(
+    graph_results = graph_analyzer.get_results(
         underlinked_threshold=thresholds.get("underlinked_min_inbound", 3),
         overlinked_threshold=thresholds.get("overlinked_max_outbound", 50),
         sink_min_inbound=thresholds.get("link_sink_min_inbound", 5),
@@ -100,8 +117,7 @@ def run_full_analysis(
     # Generate markdown report
     report = generate_graph_report(graph_results)
     report_file = output_dir / "link_graph_report.md"
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(report)
+    report_file.write_bytes(report.encode('utf-8'))
     print(f"Report saved to: {report_file}")
 
     # 4. HTTP Check (optional, skip by default for speed)
@@ -117,10 +133,9 @@ def run_full_analysis(
     return results
 
 
-def generate_summary_report(results: dict, output_path: Path) -> None:
-    """Generate overall summary report"""
-
-    lines = [
+def _iter_report_lines(results: dict):
+    """Yield the lines of the overall summary report"""
+    yield from [
         "# Link Analysis Summary Report",
         "",
         f"**Generated:** {results['metadata']['analyzed_at']}",
@@ -133,74 +148,70 @@ def generate_summary_report(results: dict, output_path: Path) -> None:
     # Outbound summary
     if results.get("outbound"):
         ob = results["outbound"]
-        lines.extend([
-            "### Outbound Links",
-            f"- Files analyzed: {ob['files_analyzed']}",
-            f"- Unique external links: {ob['unique_links']}",
-            f"- Unique domains: {ob['unique_domains']}",
-            f"- Total occurrences: {ob['total_link_occurrences']}",
-            "",
-        ])
+        yield "### Outbound Links"
+        yield f"- Files analyzed: {ob['files_analyzed']}"
+        yield f"- Unique external links: {ob['unique_links']}"
+        yield f"- Unique domains: {ob['unique_domains']}"
+        yield f"- Total occurrences: {ob['total_link_occurrences']}"
+        yield ""
 
     # Internal summary
     if results.get("internal"):
         il = results["internal"]
-        lines.extend([
-            "### Internal Links",
-            f"- Files analyzed: {il['files_analyzed']}",
-            f"- Links checked: {il['total_links_checked']}",
-            f"- Valid links: {il['valid_links']}",
-            f"- **Broken links: {il['broken_links']}**",
-            "",
-        ])
+        yield "### Internal Links"
+        yield f"- Files analyzed: {il['files_analyzed']}"
+        yield f"- Links checked: {il['total_links_checked']}"
+        yield f"- Valid links: {il['valid_links']}"
+        yield f"- **Broken links: {il['broken_links']}**"
+        yield ""
 
     # Link graph summary
     if results.get("link_graph"):
         lg = results["link_graph"]
         meta = lg["metadata"]
         summary = lg["summary"]
-        lines.extend([
-            "### Link Graph",
-            f"- Total pages: {meta['total_pages']}",
-            f"- Total internal links: {meta['total_links']}",
-            "",
-            "#### Issues Found",
-            f"- **Orphan pages (critical):** {summary['orphan_pages']}",
-            f"- Under-linked pages: {summary['underlinked_pages']}",
-            f"- Over-linked pages: {summary['overlinked_pages']}",
-            f"- Link sinks: {summary['link_sinks']}",
-            "",
-        ])
+        yield "### Link Graph"
+        yield f"- Total pages: {meta['total_pages']}"
+        yield f"- Total internal links: {meta['total_links']}"
+        yield ""
+        yield "#### Issues Found"
+        yield f"- **Orphan pages (critical):** {summary['orphan_pages']}"
+        yield f"- Under-linked pages: {summary['underlinked_pages']}"
+        yield f"- Over-linked pages: {summary['overlinked_pages']}"
+        yield f"- Link sinks: {summary['link_sinks']}"
+        yield ""
 
     # Recommendations
-    lines.extend([
-        "## Recommendations",
-        "",
-    ])
+    yield "## Recommendations"
+    yield ""
 
     if results.get("link_graph"):
         summary = results["link_graph"]["summary"]
         if summary["orphan_pages"] > 0:
-            lines.append(f"1. **Critical:** Fix {summary['orphan_pages']} orphan pages - these may not be indexed by search engines")
+            yield f"1. **Critical:** Fix {summary['orphan_pages']} orphan pages - these may not be indexed by search engines"
         if summary["underlinked_pages"] > 0:
-            lines.append(f"2. Add internal links to {summary['underlinked_pages']} under-linked pages")
+            yield f"2. Add internal links to {summary['underlinked_pages']} under-linked pages"
         if summary["link_sinks"] > 0:
-            lines.append(f"3. Add outbound links to {summary['link_sinks']} link sink pages to distribute link equity")
+            yield f"3. Add outbound links to {summary['link_sinks']} link sink pages to distribute link equity"
 
     if results.get("internal") and results["internal"]["broken_links"] > 0:
-        lines.append(f"4. Fix {results['internal']['broken_links']} broken internal links")
+        yield f"4. Fix {results['internal']['broken_links']} broken internal links"
 
-    lines.extend([
+    yield from [
         "",
         "## Next Steps",
         "",
         "1. Review detailed reports in the output directory",
         "2. Run HTTP validation: `python http_checker.py --input outbound_links.json`",
         "3. Prioritize fixes based on SEO impact",
-    ])
+    ]
+
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write("\n".join(lines))
+def generate_summary_report(results: dict, output_path: Path) -> None:
+    """Generate overall summary report"""
+    # Stream lines through a 64KB buffer instead of joining one big string
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 16) as f:
+        f.writelines(line + "\n" for line in _iter_report_lines(results))
 
 
 def main():
@@ -212,6 +223,8 @@ def main():
     parser.add_argument("--full", action="store_true", help="Run full analysis")
     parser.add_argument("--skip-http", action="store_true", default=True,
                         help="Skip HTTP validation (default, run separately)")
+    parser.add_argument("--accurate", action="store_true",
+                        help="Use a full HTML parser even when selectolax/lxml are unavailable")
 
     args = parser.parse_args()
 
@@ -245,7 +258,8 @@ def main():
         dist_path=dist_path,
         config=config,
         output_dir=output_dir,
-        skip_http=args.skip_http
+        skip_http=args.skip_http,
+        accurate=args.accurate
     )
 
     # Save overall results
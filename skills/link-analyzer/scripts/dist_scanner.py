@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Dist Scanner
+Walks a static site once and extracts the links from every HTML file,
+so all link analyzers can share a single parse per page
+"""
+
+import os
+import sys
+import mmap
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Add shared modules to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
+from utils import parse_links, link_parser_name, load_json, save_json, MMAP_HASH_THRESHOLD
+
+# Reader threads used when scanning without a process pool
+READ_AHEAD_THREADS = 32
+
+# How many files ahead of the consumer the kernel is asked to start reading
+PREFETCH_WINDOW = 256
+
+# Bumped whenever the shape of the cached entries changes
+CACHE_FORMAT = 2
+
+# Content hashes the worker can skip parsing for (None = caching disabled)
+_cached_keys: Optional[frozenset[str]] = None
+# Passed through to parse_links in the worker
+_accurate = False
+
+
+def prefix_length(dist_path: Path) -> int:
+    """Length of the dist_path prefix (separator included) on scanned file paths"""
+    # Slicing this off is all relative_to() would do for paths under dist_path
+    return len(os.path.join(str(dist_path), ''))
+
+
+def exclusion_rules(
+    excluded_paths: list[str],
+    excluded_extensions: list[str]
+) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Turn excluded paths and extensions into the (prefixes, suffixes) is_excluded takes"""
+    # Tuples let startswith/endswith test every entry in one C call
+    return tuple(excluded_paths), tuple(ext.lower() for ext in excluded_extensions)
+
+
+def is_excluded(link: str, prefixes: tuple[str, ...], suffixes: tuple[str, ...]) -> bool:
+    """Check if a link is under an excluded path or has an excluded extension"""
+    return link.startswith(prefixes) or link.lower().endswith(suffixes)
+
+
+def iter_html_files(root: str) -> Iterator[str]:
+    """Yield HTML file paths under root in the same order as Path.glob('**/*.html')"""
+    # One scandir per directory and plain strings instead of Path objects;
+    # DirEntry caches d_type, so telling files from dirs costs no extra stat
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        # Like glob, don't recurse through symlinked directories
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                    elif entry.name.endswith('.html'):
+                        yield entry.path
+        except OSError:
+            continue
+        # Depth-first, visiting subdirectories in directory order
+        stack.extend(reversed(subdirs))
+
+
+def _init_worker(cached_keys: Optional[frozenset[str]], accurate: bool = False) -> None:
+    """Hand the already-cached content hashes and parse mode to a worker process"""
+    global _cached_keys, _accurate
+    _cached_keys = cached_keys
+    _accurate = accurate
+
+
+def _parse_one(file_path: str) -> tuple[str, Optional[str], Optional[tuple[list[str], list[str]]]]:
+    """Read one HTML file and parse it unless its content is cached (runs in a worker process)"""
+    # A single binary read feeds both the cache key and the parser. Large pages
+    # are mapped instead, so hashing (and lxml/regex parsing) reads straight
+    # from the page cache without copying the file into a bytes object
+    try:
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > MMAP_HASH_THRESHOLD:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                content = f.read()
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}", file=sys.stderr)
+        # Still yield the page so analyzers count it, just without links
+        return file_path, None, ([], [])
+
+    try:
+        # Same BLAKE2b digest as utils.file_hash, computed from the content already at hand
+        key = hashlib.blake2b(content).hexdigest() if _cached_keys is not None else None
+        if key is not None and key in _cached_keys:
+            return file_path, key, None
+
+        try:
+            return file_path, key, parse_links(content, accurate=_accurate)
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}", file=sys.stderr)
+            return file_path, key, ([], [])
+    finally:
+        if isinstance(content, mmap.mmap):
+            content.close()
+
+
+def _prefetch(paths: list[str], window: threading.Semaphore, stop: threading.Event) -> None:
+    """Ask the kernel to start reading upcoming files (POSIX_FADV_WILLNEED)"""
+    # The hints return immediately, so the device sees a deep queue of reads
+    # while the workers are still busy parsing earlier pages
+    for path in paths:
+        window.acquire()
+        if stop.is_set():
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def _load_cache(cache_path: Optional[Path], parser: str) -> dict[str, list[list[str]]]:
+    """Load the content-hash -> [<a> hrefs, other hrefs] cache, ignoring missing, corrupt or stale files"""
+    if cache_path is None or not cache_path.exists():
+        return {}
+    try:
+        cache = load_json(cache_path)
+    except Exception as e:
+        print(f"Ignoring unreadable link cache {cache_path}: {e}", file=sys.stderr)
+        return {}
+    # The same page parses differently per backend (the regex also picks up
+    # links inside comments), so entries are only reused by the same parser
+    if (not isinstance(cache, dict) or cache.get("format") != CACHE_FORMAT
+            or cache.get("parser") != parser or not isinstance(cache.get("links"), dict)):
+        return {}
+    return cache["links"]
+
+
+def scan_dist(
+    dist_path: Path,
+    workers: Optional[int] = None,
+    cache_path: Optional[Path] = None,
+    accurate: bool = False,
+    quiet: bool = False
+) -> Iterator[tuple[str, list[str], list[str]]]:
+    """Yield (file_path, <a> hrefs, other tags' hrefs) for every HTML file, reusing cached parses when cache_path is set"""
+    html_files = list(iter_html_files(str(dist_path)))
+    # Progress goes to stderr so it never mixes with JSON written to stdout,
+    # and at most ~50 times per scan however large the site is
+    progress_every = 0 if quiet else max(100, len(html_files) // 50)
+    if not quiet:
+        print(f"Found {len(html_files)} HTML files to scan...", file=sys.stderr)
+
+    parser = link_parser_name(accurate)
+    cache = _load_cache(cache_path, parser)
+    cached_keys = frozenset(cache) if cache_path else None
+    fresh_cache: dict[str, tuple[list[str], list[str]]] = {}
+    hits = 0
+
+    # Reading, hashing and parsing are all per-file work, so spread them over
+    # processes to escape the GIL. ~8 chunks per worker keeps IPC overhead low
+    # without starving the tail.
+    workers = workers or os.cpu_count() or 1
+    if workers > 1:
+        chunksize = max(1, len(html_files) // (workers * 8))
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(cached_keys, accurate)
+        )
+    else:
+        # Nothing to gain from parsing in parallel, but threads still keep
+        # many reads in flight ahead of the parser to hide I/O latency
+        _init_worker(cached_keys, accurate)
+        chunksize = 1
+        executor = ThreadPoolExecutor(max_workers=READ_AHEAD_THREADS)
+
+    # Readahead hints stay at most PREFETCH_WINDOW files ahead, so a big site
+    # can't evict pages from the cache before the workers get to them
+    window = threading.Semaphore(PREFETCH_WINDOW)
+    stop = threading.Event()
+    if hasattr(os, 'posix_fadvise'):
+        threading.Thread(target=_prefetch, args=(html_files, window, stop), daemon=True).start()
+
+    try:
+        with executor:
+            results = executor.map(_parse_one, html_files, chunksize=chunksize)
+
+            for i, (file_path, key, links) in enumerate(results, 1):
+                window.release()
+                if links is None:
+                    links = cache[key]
+                    hits += 1
+                if key is not None:
+                    fresh_cache[key] = links
+                hrefs, other_hrefs = links
+                yield file_path, hrefs, other_hrefs
+
+                if progress_every and i % progress_every == 0:
+                    print(f"Scanned {i}/{len(html_files)} files...", file=sys.stderr)
+    finally:
+        stop.set()
+        window.release()
+
+    # Only keep entries for pages that still exist, so the cache can't grow unbounded
+    if cache_path:
+        if not quiet:
+            print(f"Link cache: {hits} hits, {len(html_files) - hits} parsed", file=sys.stderr)
+        save_json({"format": CACHE_FORMAT, "parser": parser, "links": fresh_cache}, cache_path, indent=None)
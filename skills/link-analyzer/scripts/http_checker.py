@@ -5,21 +5,81 @@ Validates external links via HTTP requests with parallel processing
 """
 
 import sys
+import re
+import ssl
 import json
 import time
+import asyncio
 import argparse
+import threading
 from pathlib import Path
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from collections import defaultdict
 
 import requests
+from urllib3.exceptions import NewConnectionError
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 # Add shared modules to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
 from config_loader import load_json_config
 from utils import save_json, load_json, timestamp
 
+# Exception groups covering whichever sync HTTP client is in use
+TIMEOUT_ERRORS: tuple[type[Exception], ...] = (requests.exceptions.Timeout,)
+REDIRECT_ERRORS: tuple[type[Exception], ...] = (requests.exceptions.TooManyRedirects,)
+SSL_ERRORS: tuple[type[Exception], ...] = (requests.exceptions.SSLError,)
+CONNECTION_ERRORS: tuple[type[Exception], ...] = (requests.exceptions.ConnectionError,)
+# Failures where no connection to the host was ever made (refused, DNS).
+# Only these are cached per host; a connection dropped mid-request is not.
+NOT_CONNECTED_ERRORS: tuple[type[Exception], ...] = (NewConnectionError,)
+if HTTPX_AVAILABLE:
+    TIMEOUT_ERRORS += (httpx.TimeoutException,)
+    REDIRECT_ERRORS += (httpx.TooManyRedirects,)
+    CONNECTION_ERRORS += (httpx.NetworkError, httpx.RemoteProtocolError)
+    NOT_CONNECTED_ERRORS += (httpx.ConnectError,)
+
+# Headers for GET fallbacks: 206 Partial Content counts as success
+RANGE_HEADERS = {'Range': 'bytes=0-0', 'Accept-Encoding': 'identity'}
+
+# URLs with these prefixes are never requested over the network
+_SKIP_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:', '#')
+
+
+def _caused_by(exc: BaseException, types: type | tuple[type, ...]) -> bool:
+    """Check whether exc or any exception it was raised from is one of types"""
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, types):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
+
 
 class HTTPLinkChecker:
     """Check external links via HTTP requests"""
@@ -29,97 +89,357 @@ class HTTPLinkChecker:
         timeout: int = 5,
         max_workers: int = 20,
         retry_count: int = 1,
-        user_agent: str = "Mozilla/5.0 (compatible; LinkChecker/1.0)"
+        user_agent: str = "Mozilla/5.0 (compatible; LinkChecker/1.0)",
+        host_failure_ttl: float = 300.0
     ):
         self.timeout = timeout
         self.max_workers = max_workers
         self.retry_count = retry_count
         self.user_agent = user_agent
+        self.host_failure_ttl = host_failure_ttl
         self.results: list[dict] = []
+        self.client: "httpx.Client | requests.Session | None" = None
+        # Progress lines waiting to be written to stderr in one batch
+        self._progress_buf: list[str] = []
+        self._progress_flushed_at = time.monotonic()
+        # Hosts that failed to connect: netloc -> (message, failed_at)
+        self._host_fail: dict[str, tuple[str, float]] = {}
+        self._host_fail_lock = threading.Lock()
+
+    def _precheck(self, url: str) -> tuple[str | None, tuple[None, str, bool] | None]:
+        """Validate URL and check dead-host cache; returns (host, result if no request needed)"""
+        try:
+            parsed = urlparse(url)
+        except ValueError:
+            return None, (None, "Invalid URL", True)
+
+        # Catch relative or mangled hrefs (e.g. "http:/example.com") instantly
+        if parsed.scheme not in ('http', 'https') or not parsed.netloc or ' ' in parsed.netloc:
+            return None, (None, "Invalid URL", True)
+
+        host = parsed.netloc.lower()
+        return host, self._cached_host_failure(host)
+
+    def _cached_host_failure(self, host: str | None) -> tuple[None, str, bool] | None:
+        """Return the cached result for a host that recently failed to connect"""
+        if host is None:
+            return None
+
+        with self._host_fail_lock:
+            cached = self._host_fail.get(host)
+            if cached is None:
+                return None
+
+            message, failed_at = cached
+            # Expire old failures so a transient outage doesn't poison the whole run
+            if time.monotonic() - failed_at > self.host_failure_ttl:
+                del self._host_fail[host]
+                return None
+
+        return None, message, True
+
+    def _record_host_failure(self, host: str | None, message: str) -> tuple[None, str, bool]:
+        """Remember that a host failed to connect and return the failure result"""
+        if host is not None:
+            with self._host_fail_lock:
+                self._host_fail[host] = (message, time.monotonic())
+        return None, message, True
+
+    def _get_client(self) -> "httpx.Client | requests.Session":
+        """Get the shared HTTP client, creating it on first use"""
+        if self.client is None:
+            if HTTPX_AVAILABLE:
+                # One pooled (HTTP/2 when h2 is installed) connection per host
+                self.client = httpx.Client(
+                    http2=H2_AVAILABLE,
+                    timeout=self.timeout,
+                    headers={'User-Agent': self.user_agent},
+                    limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+                    follow_redirects=True
+                )
+            else:
+                self.client = requests.Session()
+                self.client.headers['User-Agent'] = self.user_agent
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=100,
+                    pool_maxsize=self.max_workers
+                )
+                self.client.mount('http://', adapter)
+                self.client.mount('https://', adapter)
+        return self.client
+
+    def close(self) -> None:
+        """Close the shared HTTP client and its pooled connections"""
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def _request(self, method: str, url: str, byte_range: bool = True) -> tuple[int, str]:
+        """Send a request on the shared client without downloading the body"""
+        client = self._get_client()
+        # GET fallbacks ask for a single byte so large pages aren't transferred
+        headers = RANGE_HEADERS if method == 'GET' and byte_range else None
+
+        if HTTPX_AVAILABLE:
+            with client.stream(method, url, headers=headers) as response:
+                # A 1-byte partial body is cheap to drain and keeps the connection pooled
+                if response.status_code == 206:
+                    response.read()
+                return response.status_code, response.reason_phrase
+
+        response = client.request(
+            method,
+            url,
+            headers=headers,
+            timeout=self.timeout,
+            allow_redirects=True,
+            stream=True
+        )
+        try:
+            if response.status_code == 206:
+                response.content
+            return response.status_code, response.reason
+        finally:
+            response.close()
 
     def check_url(self, url: str) -> tuple[int | None, str, bool]:
         """Check if URL is accessible"""
-        headers = {'User-Agent': self.user_agent}
+        host, precheck_result = self._precheck(url)
+        if precheck_result:
+            return precheck_result
 
         for attempt in range(self.retry_count):
             try:
                 # Try HEAD first (faster)
-                response = requests.head(
-                    url,
-                    timeout=self.timeout,
-                    headers=headers,
-                    allow_redirects=True
-                )
+                status_code, reason = self._request('HEAD', url)
 
                 # Some sites block HEAD, fallback to GET
-                if response.status_code in [405, 403]:
-                    response = requests.get(
-                        url,
-                        timeout=self.timeout,
-                        headers=headers,
-                        allow_redirects=True,
-                        stream=True
-                    )
-                    # Only read first 1KB
-                    next(response.iter_content(1024), None)
-                    response.close()
+                if status_code in [405, 403]:
+                    status_code, reason = self._request('GET', url)
+                    # Empty resources can't serve byte 0; ask again for the whole thing
+                    if status_code == 416:
+                        status_code, reason = self._request('GET', url, byte_range=False)
 
-                is_broken = response.status_code >= 400
-                return response.status_code, response.reason, is_broken
+                is_broken = status_code >= 400
+                return status_code, reason, is_broken
 
-            except requests.exceptions.Timeout:
+            except TIMEOUT_ERRORS:
                 if attempt == self.retry_count - 1:
                     return None, "Timeout", True
                 time.sleep(1)
 
-            except requests.exceptions.ConnectionError:
-                return None, "Connection Error (Domain may not exist)", True
+            except REDIRECT_ERRORS:
+                return None, "Too Many Redirects", True
+
+            except SSL_ERRORS:
+                return None, "SSL Certificate Error", True
+
+            except CONNECTION_ERRORS as e:
+                # httpx has no SSL exception of its own; a bad certificate
+                # surfaces as a ConnectError, and says nothing about the host
+                if _caused_by(e, ssl.SSLError):
+                    return None, "SSL Certificate Error", True
+                if _caused_by(e, NOT_CONNECTED_ERRORS):
+                    return self._record_host_failure(host, "Connection Error (Domain may not exist)")
+                return None, "Connection Error", True
+
+            except Exception as e:
+                return None, f"Error: {str(e)}", True
+
+        return None, "Unknown Error", True
+
+    async def check_url_async(self, session: "aiohttp.ClientSession", url: str) -> tuple[int | None, str, bool]:
+        """Check if URL is accessible using a shared aiohttp session"""
+        host, precheck_result = self._precheck(url)
+        if precheck_result:
+            return precheck_result
+
+        for attempt in range(self.retry_count):
+            try:
+                # Try HEAD first (faster)
+                async with session.head(url, allow_redirects=True) as response:
+                    status_code, reason = response.status, response.reason
+
+                # Some sites block HEAD, fallback to GET for a single byte only
+                if status_code in [405, 403]:
+                    async with session.get(
+                        url,
+                        allow_redirects=True,
+                        headers=RANGE_HEADERS
+                    ) as response:
+                        status_code, reason = response.status, response.reason
+                        if status_code == 206:
+                            await response.read()
 
-            except requests.exceptions.TooManyRedirects:
+                    # Empty resources can't serve byte 0; ask again for the whole thing
+                    if status_code == 416:
+                        async with session.get(url, allow_redirects=True) as response:
+                            status_code, reason = response.status, response.reason
+
+                is_broken = status_code >= 400
+                return status_code, reason, is_broken
+
+            except asyncio.TimeoutError:
+                if attempt == self.retry_count - 1:
+                    return None, "Timeout", True
+                await asyncio.sleep(1)
+
+            except aiohttp.TooManyRedirects:
                 return None, "Too Many Redirects", True
 
-            except requests.exceptions.SSLError:
+            except aiohttp.ClientSSLError:
                 return None, "SSL Certificate Error", True
 
+            except aiohttp.ClientConnectorError:
+                # Couldn't connect at all (refused, DNS), so skip the host for a while
+                return self._record_host_failure(host, "Connection Error (Domain may not exist)")
+
+            except aiohttp.ClientConnectionError:
+                # Dropped or reset on an open connection; says nothing about the host
+                return None, "Connection Error", True
+
             except Exception as e:
                 return None, f"Error: {str(e)}", True
 
         return None, "Unknown Error", True
 
+    def _build_result(self, url: str, info: dict, status: tuple[int | None, str, bool]) -> dict:
+        """Build a result record for a checked URL"""
+        status_code, status_msg, is_broken = status
+        return {
+            'url': url,
+            'status_code': status_code,
+            'status_message': status_msg,
+            'is_broken': is_broken,
+            'occurrences': info.get('count', 1),
+            'sample_pages': info.get('pages', [])[:5]
+        }
+
+    def _print_progress(self, completed: int, total: int, result: dict) -> None:
+        """Queue a progress line for a completed URL, writing to stderr in batches"""
+        status = "OK" if not result['is_broken'] else "BROKEN"
+        url_display = result['url'][:60] + "..." if len(result['url']) > 60 else result['url']
+        self._progress_buf.append(f"[{completed}/{total}] [{status}] {url_display}\n")
+
+        now = time.monotonic()
+        if (len(self._progress_buf) >= max(1, total // 200)
+                or now - self._progress_flushed_at > 0.5
+                or completed == total):
+            sys.stderr.write(''.join(self._progress_buf))
+            sys.stderr.flush()
+            self._progress_buf.clear()
+            self._progress_flushed_at = now
+
+    async def _check_urls_async(self, urls_with_info: dict[str, dict]) -> list[dict]:
+        """Check multiple URLs concurrently on a single event loop"""
+        total = len(urls_with_info)
+        completed = 0
+        semaphore = asyncio.Semaphore(self.max_workers * 10)
+
+        # One connector for the whole run so connections and DNS lookups are reused
+        connector = aiohttp.TCPConnector(limit=200, limit_per_host=4, ttl_dns_cache=300)
+        # A total timeout would also count time spent queued for one of the
+        # per-host connections, failing healthy URLs on busy hosts; only
+        # limit the time actually spent connecting and reading
+        session_timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=self.timeout, sock_read=self.timeout
+        )
+
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=session_timeout,
+            headers={'User-Agent': self.user_agent}
+        ) as session:
+
+            async def check_single(url: str, info: dict) -> None:
+                nonlocal completed
+                async with semaphore:
+                    status = await self.check_url_async(session, url)
+
+                completed += 1
+                result = self._build_result(url, info, status)
+                self.results.append(result)
+                self._print_progress(completed, total, result)
+
+            await asyncio.gather(*(
+                check_single(url, info) for url, info in urls_with_info.items()
+            ))
+
+        return self.results
+
     def check_urls(self, urls_with_info: dict[str, dict]) -> list[dict]:
         """Check multiple URLs in parallel"""
+        # Record non-HTTP links up front instead of spending a request on them
+        checkable: dict[str, dict] = {}
+        skipped = 0
+        for url, info in urls_with_info.items():
+            if not url.strip() or url.lower().startswith(_SKIP_SCHEMES):
+                self.results.append(self._build_result(url, info, (None, "Skipped scheme", False)))
+                skipped += 1
+            else:
+                checkable[url] = info
+
+        if skipped:
+            print(f"Skipped {skipped} non-HTTP URLs (mailto:, tel:, javascript:, data:, #)")
+
+        urls_with_info = checkable
         total = len(urls_with_info)
         completed = 0
 
+        if AIOHTTP_AVAILABLE:
+            print(f"Checking {total} URLs concurrently (max {self.max_workers * 10} in flight)...")
+            return asyncio.run(self._check_urls_async(urls_with_info))
+
         def check_single(url: str, info: dict) -> dict:
-            status_code, status_msg, is_broken = self.check_url(url)
-            return {
-                'url': url,
-                'status_code': status_code,
-                'status_message': status_msg,
-                'is_broken': is_broken,
-                'occurrences': info.get('count', 1),
-                'sample_pages': info.get('pages', [])[:5]
-            }
+            return self._build_result(url, info, self.check_url(url))
 
         print(f"Checking {total} URLs in parallel (max {self.max_workers} workers)...")
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_url = {
-                executor.submit(check_single, url, info): url
-                for url, info in urls_with_info.items()
-            }
+        self._get_client()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                future_to_url = {
+                    executor.submit(check_single, url, info): url
+                    for url, info in urls_with_info.items()
+                }
+
+                for future in as_completed(future_to_url):
+                    completed += 1
+                    result = future.result()
+                    self.results.append(result)
+                    self._print_progress(completed, total, result)
+        finally:
+            self.close()
 
-            for future in as_completed(future_to_url):
-                completed += 1
-                result = future.result()
-                self.results.append(result)
+        return self.results
 
-                status = "OK" if not result['is_broken'] else "BROKEN"
-                url_display = result['url'][:60] + "..." if len(result['url']) > 60 else result['url']
-                print(f"[{completed}/{total}] [{status}] {url_display}")
 
-        return self.results
+def load_urls_with_info(input_path: Path) -> dict[str, dict]:
+    """Load outbound links as {url: {count, pages}}, streaming when possible"""
+    # outbound_links lists each page once; the number of occurrences is in
+    # link_counts (files from before it existed fall back to the page count)
+    urls_with_info = {}
+
+    if IJSON_AVAILABLE:
+        # Stream both mappings instead of materializing the whole file
+        with open(input_path, 'rb') as f:
+            link_counts = dict(ijson.kvitems(f, 'link_counts'))
+        with open(input_path, 'rb') as f:
+            for url, pages in ijson.kvitems(f, 'outbound_links'):
+                urls_with_info[url] = {
+                    'count': link_counts.get(url, len(pages)),
+                    'pages': pages[:5]
+                }
+        return urls_with_info
+
+    outbound_data = load_json(input_path)
+    link_counts = outbound_data.get("link_counts", {})
+    for url, pages in outbound_data.get("outbound_links", {}).items():
+        urls_with_info[url] = {
+            'count': link_counts.get(url, len(pages)),
+            'pages': pages[:5]
+        }
+    return urls_with_info
 
 
 def filter_false_positives(
@@ -132,7 +452,10 @@ def filter_false_positives(
         'linkedin.com', 'stackoverflow.com', 'twitter.com', 'x.com',
         'facebook.com', 'instagram.com', 'pixabay.com', 'unsplash.com'
     ]
-    ignore_codes = ignore_status_codes or [403, 503, 520, 999]
+    ignore_codes = frozenset(ignore_status_codes or [403, 503, 520, 999])
+
+    # One regex scan per URL instead of a substring test per domain
+    bot_blocker_re = re.compile('|'.join(re.escape(d.lower()) for d in bot_blockers))
 
     real_broken = []
     false_positives = []
@@ -142,22 +465,15 @@ def filter_false_positives(
             continue
 
         url = result['url'].lower()
-        status_code = result['status_code']
 
-        # Check if it's a known bot blocker
-        is_false_positive = False
-        for domain in bot_blockers:
-            if domain in url:
-                is_false_positive = True
-                break
-
-        # Check if status code should be ignored
-        if status_code in ignore_codes:
-            is_false_positive = True
-
-        # Skip mailto/tel links
-        if url.startswith('mailto:') or url.startswith('tel:'):
-            is_false_positive = True
+        is_false_positive = (
+            # Known bot blocker
+            bot_blocker_re.search(url) is not None
+            # Status code should be ignored
+            or result['status_code'] in ignore_codes
+            # Skip mailto/tel links
+            or url.startswith(('mailto:', 'tel:'))
+        )
 
         if is_false_positive:
             false_positives.append(result)
@@ -195,16 +511,7 @@ def main():
         print(f"Error: Input file not found: {input_path}", file=sys.stderr)
         sys.exit(1)
 
-    outbound_data = load_json(input_path)
-    outbound_links = outbound_data.get("outbound_links", {})
-
-    # Prepare URLs with metadata
-    urls_with_info = {}
-    for url, pages in outbound_links.items():
-        urls_with_info[url] = {
-            'count': len(pages),
-            'pages': pages
-        }
+    urls_with_info = load_urls_with_info(input_path)
 
     # Run checker
     checker = HTTPLinkChecker(
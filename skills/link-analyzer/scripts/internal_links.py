@@ -4,21 +4,23 @@ Internal Links Checker
 Validates all internal links in static site point to existing pages
 """
 
+import os
 import sys
-import re
 import json
 import argparse
 import urllib.parse
 from pathlib import Path
-from collections import defaultdict
-
-from bs4 import BeautifulSoup
+from typing import Iterable
+from operator import itemgetter
+from itertools import chain, groupby
 
 # Add shared modules to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
 from config_loader import load_json_config
 from utils import save_json, timestamp
 
+from dist_scanner import scan_dist, prefix_length, exclusion_rules, is_excluded
+
 
 class InternalLinksChecker:
     """Check internal links for broken references"""
@@ -37,14 +39,19 @@ class InternalLinksChecker:
         ]
         self.broken_links: list[dict] = []
         self.valid_links: int = 0
-
-    def extract_internal_links(self, content: str) -> list[str]:
-        """Extract all internal links from HTML content"""
-        pattern = r'href=["\']([^"\']*)["\']'
-        links = re.findall(pattern, content, re.IGNORECASE)
-
+        self.total_links_checked: int = 0
+        self.files_analyzed: int = 0
+        self._exclusions = exclusion_rules(self.excluded_paths, self.excluded_extensions)
+        self._prefix_len = prefix_length(dist_path)
+        # Link -> check_link_exists() result
+        self._exists_cache: dict[str, tuple[bool, str | None]] = {}
+        # Every file/dir under dist_path, walked once on first use
+        self._served: frozenset[str] | None = None
+
+    def extract_internal_links(self, hrefs: Iterable[str]) -> list[str]:
+        """Extract all internal links from a page's hrefs"""
         internal_links = []
-        for link in links:
+        for link in hrefs:
             # Only internal links (starting with /)
             if link.startswith('/'):
                 # Remove fragment
@@ -66,88 +73,103 @@ class InternalLinksChecker:
 
     def is_excluded(self, link: str) -> bool:
         """Check if link should be excluded from analysis"""
-        # Check excluded paths
-        for pattern in self.excluded_paths:
-            if link.startswith(pattern):
-                return True
-
-        # Check excluded extensions
-        for ext in self.excluded_extensions:
-            if link.lower().endswith(ext):
-                return True
+        return is_excluded(link, *self._exclusions)
 
-        return False
+    def _build_served_paths(self) -> frozenset[str]:
+        """Collect every file and directory under dist_path as a relative POSIX path"""
+        served = {'.'}
+        for root, dirs, files in os.walk(self.dist_path):
+            rel_root = Path(root).relative_to(self.dist_path)
+            for name in dirs + files:
+                served.add((rel_root / name).as_posix())
+        return frozenset(served)
 
     def check_link_exists(self, link: str) -> tuple[bool, str | None]:
         """Check if a link target exists"""
+        # The same target is linked from many pages; resolve each one once
+        result = self._exists_cache.get(link)
+        if result is None:
+            result = self._exists_cache[link] = self._find_link_target(link)
+        return result
+
+    def _find_link_target(self, link: str) -> tuple[bool, str | None]:
+        """Look up a link target in the served tree, then on disk"""
+        if self._served is None:
+            self._served = self._build_served_paths()
+
         relative_path = link.lstrip('/')
 
         # Try different path variations
         possible_paths = [
-            self.dist_path / relative_path,
-            self.dist_path / relative_path / 'index.html',
-            self.dist_path / (relative_path + '.html'),
-            self.dist_path / relative_path.rstrip('/') / 'index.html',
+            Path(relative_path),
+            Path(relative_path) / 'index.html',
+            Path(relative_path + '.html'),
+            Path(relative_path.rstrip('/')) / 'index.html',
         ]
 
+        # In-memory lookups against the pre-walked tree cover almost every link
         for path in possible_paths:
-            if path.exists():
-                return True, str(path)
-
-        return False, None
-
-    def analyze(self) -> dict:
-        """Analyze all HTML files for broken internal links"""
-        html_files = list(self.dist_path.glob('**/*.html'))
-        print(f"Found {len(html_files)} HTML files to check...")
+            if path.as_posix() in self._served:
+                return True, str(self.dist_path / path)
 
-        total_links_checked = 0
-        broken_by_source: dict[str, list[str]] = defaultdict(list)
-
-        for i, file_path in enumerate(html_files, 1):
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-
-                relative_file = str(file_path.relative_to(self.dist_path))
-                internal_links = self.extract_internal_links(content)
-
-                for link in internal_links:
-                    if self.is_excluded(link):
-                        continue
-
-                    total_links_checked += 1
-                    exists, found_path = self.check_link_exists(link)
-
-                    if not exists:
-                        self.broken_links.append({
-                            'source_file': relative_file,
-                            'broken_link': link
-                        })
-                        broken_by_source[relative_file].append(link)
-                    else:
-                        self.valid_links += 1
-
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}", file=sys.stderr)
+        # Anything the walk can't vouch for ('..' segments, symlinked dirs) hits the filesystem
+        for path in possible_paths:
+            if (self.dist_path / path).exists():
+                return True, str(self.dist_path / path)
 
-            if i % 100 == 0:
-                print(f"Checked {i}/{len(html_files)} files...")
+        return False, None
 
-        print(f"Analysis complete. Checked {total_links_checked} internal links.")
+    def ingest(self, file_path: str, hrefs: list[str], other_hrefs: list[str] = ()) -> None:
+        """Check the internal links of one scanned HTML file"""
+        self.files_analyzed += 1
+        relative_file = os.fspath(file_path)[self._prefix_len:]
+        # Canonical/alternate <link>s, <area>s etc. must resolve too; they sit
+        # mostly in <head>, so checking them first keeps roughly document order
+        internal_links = self.extract_internal_links(chain(other_hrefs, hrefs))
+
+        for link in internal_links:
+            if self.is_excluded(link):
+                continue
+
+            self.total_links_checked += 1
+            exists, found_path = self.check_link_exists(link)
+
+            if not exists:
+                self.broken_links.append({
+                    'source_file': relative_file,
+                    'broken_link': link
+                })
+            else:
+                self.valid_links += 1
+
+    def get_results(self) -> dict:
+        """Build results from all ingested files"""
+        print(f"Analysis complete. Checked {self.total_links_checked} internal links.")
+
+        # Each file's broken links are appended together, so grouping the list
+        # in order rebuilds the per-source view without a second structure
+        broken_by_source: dict[str, list[str]] = {}
+        for source, entries in groupby(self.broken_links, key=itemgetter('source_file')):
+            broken_by_source.setdefault(source, []).extend(e['broken_link'] for e in entries)
 
         return {
             "metadata": {
                 "analyzed_at": timestamp(),
-                "files_analyzed": len(html_files),
-                "total_links_checked": total_links_checked,
+                "files_analyzed": self.files_analyzed,
+                "total_links_checked": self.total_links_checked,
                 "valid_links": self.valid_links,
                 "broken_links": len(self.broken_links)
             },
             "broken_links": self.broken_links,
-            "broken_by_source": dict(broken_by_source)
+            "broken_by_source": broken_by_source
         }
 
+    def analyze(self, accurate: bool = False) -> dict:
+        """Analyze all HTML files for broken internal links"""
+        for file_path, hrefs, other_hrefs in scan_dist(self.dist_path, accurate=accurate):
+            self.ingest(file_path, hrefs, other_hrefs)
+        return self.get_results()
+
 
 def main():
     parser = argparse.ArgumentParser(description="Internal Links Checker")
@@ -155,6 +177,8 @@ def main():
     parser.add_argument("--config", help="Path to config.json")
     parser.add_argument("--output", "-o", help="Output file path")
     parser.add_argument("--exclude", nargs="+", help="Paths to exclude")
+    parser.add_argument("--accurate", action="store_true",
+                        help="Use a full HTML parser even when selectolax/lxml are unavailable")
 
     args = parser.parse_args()
 
@@ -178,7 +202,7 @@ def main():
         excluded_paths=excluded_paths,
         excluded_extensions=excluded_extensions
     )
-    results = checker.analyze()
+    results = checker.analyze(accurate=args.accurate)
 
     # Output
     if args.output:
@@ -8,22 +8,33 @@ Builds internal link graph and calculates link metrics:
 - Link sinks (receive but don't pass)
 """
 
+import os
 import sys
-import re
 import json
+import heapq
 import argparse
 import urllib.parse
 from pathlib import Path
-from collections import defaultdict
-from dataclasses import dataclass, asdict
+from itertools import chain
+from collections import Counter
+from dataclasses import dataclass
 
-from bs4 import BeautifulSoup
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 # Add shared modules to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
 from config_loader import load_json_config
 from utils import save_json, timestamp
 
+from dist_scanner import scan_dist, prefix_length, exclusion_rules, is_excluded
+
+# Per-page cap on the inbound/outbound URLs listed in the output
+MAX_LISTED_LINKS = 10
+
 
 @dataclass
 class PageMetrics:
@@ -51,46 +62,75 @@ class LinkGraphAnalyzer:
             '.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg',
             '.ico', '.pdf', '.xml', '.txt', '.woff', '.woff2', '.json'
         ]
-
-        # Link graph: source -> list of targets
-        self.link_graph: dict[str, list[str]] = defaultdict(list)
-        # All pages found
-        self.all_pages: set[str] = set()
+        self._prefix_len = prefix_length(dist_path)
+        self._exclusions = exclusion_rules(self.excluded_paths, self.excluded_extensions)
+
+        # Every page URL is interned once; the graph itself only holds int ids
+        self._url_id: dict[str, int] = {}
+        self._id_url: list[str] = []
+        # Link graph: source id -> list of target ids
+        self._graph: dict[int, list[int]] = {}
+        # Raw href -> target id (-1 if not an internal target). Nav and footer
+        # links repeat on every page, so each is normalized only once.
+        self._resolved_hrefs: dict[str, int] = {}
         # Metrics per page
         self.metrics: dict[str, PageMetrics] = {}
+        # Inbound/outbound counts indexed by page id (NumPy arrays when available)
+        self._inbound = []
+        self._outbound = []
+
+    def _intern(self, url: str) -> int:
+        """Return the id for url, assigning the next one on first sight"""
+        url_id = self._url_id.get(url)
+        if url_id is None:
+            url_id = self._url_id[url] = len(self._id_url)
+            self._id_url.append(url)
+        return url_id
+
+    @property
+    def all_pages(self) -> set[str]:
+        """All pages found, as URLs"""
+        return set(self._id_url)
+
+    @property
+    def link_graph(self) -> dict[str, list[str]]:
+        """Link graph as URLs: source -> list of targets"""
+        id_url = self._id_url
+        return {id_url[src]: [id_url[t] for t in targets] for src, targets in self._graph.items()}
 
     def normalize_url(self, url: str) -> str:
         """Normalize URL to consistent format"""
-        # Remove fragment
-        if '#' in url:
-            url = url.split('#')[0]
-
-        # Remove query string
-        if '?' in url:
-            url = url.split('?')[0]
-
-        # Decode URL encoding
-        try:
-            url = urllib.parse.unquote(url)
-        except:
-            pass
+        # Remove fragment, then query string
+        i = url.find('#')
+        if i >= 0:
+            url = url[:i]
+        i = url.find('?')
+        if i >= 0:
+            url = url[:i]
+
+        # Decode URL encoding (nothing to do without a '%')
+        if '%' in url:
+            try:
+                url = urllib.parse.unquote(url)
+            except:
+                pass
 
         # Ensure leading slash
-        if not url.startswith('/'):
+        if not url or url[0] != '/':
             url = '/' + url
 
         # Ensure trailing slash for directories
-        if not url.endswith('/') and '.' not in url.split('/')[-1]:
-            url = url + '/'
+        if url[-1] != '/' and '.' not in url[url.rfind('/') + 1:]:
+            url += '/'
 
         return url
 
-    def file_path_to_url(self, file_path: Path) -> str:
+    def file_path_to_url(self, file_path: str) -> str:
         """Convert file path to URL"""
-        relative = file_path.relative_to(self.dist_path)
+        relative = os.fspath(file_path)[self._prefix_len:]
 
         # Convert to URL format
-        url = '/' + str(relative).replace('\\', '/')
+        url = '/' + relative.replace('\\', '/')
 
         # Remove index.html
         if url.endswith('/index.html'):
@@ -102,24 +142,13 @@ class LinkGraphAnalyzer:
 
     def is_excluded(self, url: str) -> bool:
         """Check if URL should be excluded"""
-        for pattern in self.excluded_paths:
-            if url.startswith(pattern):
-                return True
-
-        for ext in self.excluded_extensions:
-            if url.lower().endswith(ext):
-                return True
+        return is_excluded(url, *self._exclusions)
 
-        return False
-
-    def extract_internal_links(self, content: str) -> list[str]:
-        """Extract internal links from HTML"""
-        soup = BeautifulSoup(content, 'html.parser')
+    def extract_internal_links(self, hrefs: list[str]) -> list[str]:
+        """Extract internal links from a page's hrefs"""
         links = []
 
-        for a_tag in soup.find_all('a', href=True):
-            href = a_tag['href']
-
+        for href in hrefs:
             # Only internal links
             if href.startswith('/'):
                 normalized = self.normalize_url(href)
@@ -128,57 +157,81 @@ class LinkGraphAnalyzer:
 
         return links
 
-    def build_graph(self) -> None:
+    def ingest(self, file_path: str, hrefs: list[str]) -> None:
+        """Add one scanned HTML file to the link graph"""
+        source_url = self.file_path_to_url(file_path)
+
+        if self.is_excluded(source_url):
+            return
+
+        # Interning the targets also tracks them as pages
+        intern = self._intern
+        resolved = self._resolved_hrefs
+        source_id = intern(source_url)
+
+        # Single pass: resolve each href to a page id, store unique links only
+        seen = set()
+        targets = []
+        for href in hrefs:
+            target = resolved.get(href)
+            if target is None:
+                # Only internal links; -1 marks hrefs that never become a target
+                if not href.startswith('/'):
+                    target = -1
+                else:
+                    url = self.normalize_url(href)
+                    target = -1 if self.is_excluded(url) else intern(url)
+                resolved[href] = target
+
+            if target >= 0 and target not in seen:
+                seen.add(target)
+                targets.append(target)
+
+        self._graph[source_id] = targets
+
+    def build_graph(self, accurate: bool = False) -> None:
         """Build the complete link graph"""
-        html_files = list(self.dist_path.glob('**/*.html'))
-        print(f"Building link graph from {len(html_files)} HTML files...")
-
-        for i, file_path in enumerate(html_files, 1):
-            source_url = self.file_path_to_url(file_path)
-
-            if self.is_excluded(source_url):
-                continue
-
-            self.all_pages.add(source_url)
-
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-
-                links = self.extract_internal_links(content)
-
-                # Store unique links only
-                unique_links = list(set(links))
-                self.link_graph[source_url] = unique_links
-
-                # Also track target pages
-                for link in unique_links:
-                    self.all_pages.add(link)
-
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}", file=sys.stderr)
-
-            if i % 100 == 0:
-                print(f"Processed {i}/{len(html_files)} files...")
-
-        print(f"Graph built. {len(self.all_pages)} pages, {sum(len(v) for v in self.link_graph.values())} links.")
+        for file_path, hrefs, _ in scan_dist(self.dist_path, accurate=accurate):
+            self.ingest(file_path, hrefs)
 
     def calculate_metrics(self) -> None:
         """Calculate metrics for each page"""
-        # Build reverse graph (inbound links)
-        inbound_from: dict[str, list[str]] = defaultdict(list)
-
-        for source, targets in self.link_graph.items():
-            for target in targets:
-                inbound_from[target].append(source)
-
-        # Calculate metrics for each page
-        for page in self.all_pages:
-            inbound_list = inbound_from.get(page, [])
-            outbound_list = self.link_graph.get(page, [])
-
-            inbound_count = len(inbound_list)
-            outbound_count = len(outbound_list)
+        total_links = sum(len(v) for v in self._graph.values())
+        print(f"Graph built. {len(self._id_url)} pages, {total_links} links.")
+
+        id_url = self._id_url
+        n = len(id_url)
+
+        # Build reverse graph (inbound links), indexed by page id. Sources are
+        # walked in URL order, so the first MAX_LISTED_LINKS kept per page are
+        # exactly the ones the output lists; the rest are only counted.
+        inbound_from: list[list[int]] = [[] for _ in id_url]
+
+        for source in sorted(self._graph, key=id_url.__getitem__):
+            for target in self._graph[source]:
+                sources = inbound_from[target]
+                if len(sources) < MAX_LISTED_LINKS:
+                    sources.append(source)
+
+        # Per-page counts, vectorized when NumPy is installed
+        if NUMPY_AVAILABLE:
+            targets = np.fromiter(chain.from_iterable(self._graph.values()), dtype=np.int64, count=total_links)
+            sources = np.fromiter(self._graph.keys(), dtype=np.int64, count=len(self._graph))
+            self._inbound = np.bincount(targets, minlength=n)
+            self._outbound = np.zeros(n, dtype=np.int64)
+            self._outbound[sources] = np.fromiter(map(len, self._graph.values()), dtype=np.int64, count=len(self._graph))
+            inbound_counts = self._inbound.tolist()
+            outbound_counts = self._outbound.tolist()
+        else:
+            # Counter tallies the flattened edges in C rather than a Python loop
+            counts = Counter(chain.from_iterable(self._graph.values()))
+            self._inbound = inbound_counts = [counts[i] for i in range(n)]
+            self._outbound = outbound_counts = [len(self._graph.get(i, ())) for i in range(n)]
+
+        # Calculate metrics for each page; strings only come back for the output
+        for page_id, page in enumerate(id_url):
+            inbound_count = inbound_counts[page_id]
+            outbound_count = outbound_counts[page_id]
 
             # Calculate ratio
             if outbound_count == 0:
@@ -191,53 +244,63 @@ class LinkGraphAnalyzer:
                 inbound=inbound_count,
                 outbound=outbound_count,
                 ratio=round(ratio, 2) if ratio != float('inf') else -1,  # -1 represents infinity
-                inbound_from=sorted(inbound_list)[:10],  # Limit for output size
-                outbound_to=sorted(outbound_list)[:10]
+                inbound_from=[id_url[i] for i in inbound_from[page_id]],  # Already sorted
+                outbound_to=heapq.nsmallest(MAX_LISTED_LINKS, (id_url[i] for i in self._graph.get(page_id, ())))
             )
 
+    def _pages_where(self, predicate) -> list[PageMetrics]:
+        """Metrics of pages whose (inbound, outbound) counts satisfy predicate, in page order"""
+        # predicate sticks to & and comparisons, so it works on NumPy arrays and ints alike
+        if NUMPY_AVAILABLE and len(self._inbound):
+            page_ids = np.flatnonzero(predicate(self._inbound, self._outbound)).tolist()
+        else:
+            page_ids = [
+                i for i, (inbound, outbound) in enumerate(zip(self._inbound, self._outbound))
+                if predicate(inbound, outbound)
+            ]
+        return [self.metrics[self._id_url[i]] for i in page_ids]
+
     def find_orphans(self) -> list[str]:
         """Find pages with zero inbound links"""
         orphans = []
-        for page, metrics in self.metrics.items():
-            if metrics.inbound == 0:
-                # Exclude homepage
-                if page != '/':
-                    orphans.append(page)
+        for metrics in self._pages_where(lambda inbound, outbound: inbound == 0):
+            # Exclude homepage
+            if metrics.url != '/':
+                orphans.append(metrics.url)
         return sorted(orphans)
 
     def find_underlinked(self, threshold: int = 3) -> list[dict]:
         """Find pages with fewer than threshold inbound links"""
         underlinked = []
-        for page, metrics in self.metrics.items():
-            if 0 < metrics.inbound < threshold:
-                underlinked.append({
-                    'url': page,
-                    'inbound': metrics.inbound,
-                    'inbound_from': metrics.inbound_from
-                })
+        for metrics in self._pages_where(lambda inbound, outbound: (inbound > 0) & (inbound < threshold)):
+            underlinked.append({
+                'url': metrics.url,
+                'inbound': metrics.inbound,
+                'inbound_from': metrics.inbound_from
+            })
         return sorted(underlinked, key=lambda x: x['inbound'])
 
     def find_overlinked(self, threshold: int = 50) -> list[dict]:
         """Find pages with more than threshold outbound links"""
         overlinked = []
-        for page, metrics in self.metrics.items():
-            if metrics.outbound > threshold:
-                overlinked.append({
-                    'url': page,
-                    'outbound': metrics.outbound
-                })
+        for metrics in self._pages_where(lambda inbound, outbound: outbound > threshold):
+            overlinked.append({
+                'url': metrics.url,
+                'outbound': metrics.outbound
+            })
         return sorted(overlinked, key=lambda x: x['outbound'], reverse=True)
 
     def find_link_sinks(self, min_inbound: int = 5, max_outbound: int = 2) -> list[dict]:
         """Find pages that receive links but don't pass them"""
         sinks = []
-        for page, metrics in self.metrics.items():
-            if metrics.inbound >= min_inbound and metrics.outbound <= max_outbound:
-                sinks.append({
-                    'url': page,
-                    'inbound': metrics.inbound,
-                    'outbound': metrics.outbound
-                })
+        for metrics in self._pages_where(
+            lambda inbound, outbound: (inbound >= min_inbound) & (outbound <= max_outbound)
+        ):
+            sinks.append({
+                'url': metrics.url,
+                'inbound': metrics.inbound,
+                'outbound': metrics.outbound
+            })
         return sorted(sinks, key=lambda x: x['inbound'], reverse=True)
 
     def get_top_pages_by_inbound(self, limit: int = 20) -> list[dict]:
@@ -257,10 +320,26 @@ class LinkGraphAnalyzer:
         underlinked_threshold: int = 3,
         overlinked_threshold: int = 50,
         sink_min_inbound: int = 5,
-        sink_max_outbound: int = 2
+        sink_max_outbound: int = 2,
+        accurate: bool = False
     ) -> dict:
         """Run full analysis"""
-        self.build_graph()
+        self.build_graph(accurate=accurate)
+        return self.get_results(
+            underlinked_threshold=underlinked_threshold,
+            overlinked_threshold=overlinked_threshold,
+            sink_min_inbound=sink_min_inbound,
+            sink_max_outbound=sink_max_outbound
+        )
+
+    def get_results(
+        self,
+        underlinked_threshold: int = 3,
+        overlinked_threshold: int = 50,
+        sink_min_inbound: int = 5,
+        sink_max_outbound: int = 2
+    ) -> dict:
+        """Calculate metrics and build results from the ingested graph"""
         self.calculate_metrics()
 
         orphans = self.find_orphans()
@@ -272,8 +351,8 @@ class LinkGraphAnalyzer:
         return {
             "metadata": {
                 "analyzed_at": timestamp(),
-                "total_pages": len(self.all_pages),
-                "total_links": sum(len(v) for v in self.link_graph.values()),
+                "total_pages": len(self._id_url),
+                "total_links": sum(len(v) for v in self._graph.values()),
                 "thresholds": {
                     "underlinked": underlinked_threshold,
                     "overlinked": overlinked_threshold,
@@ -292,8 +371,9 @@ class LinkGraphAnalyzer:
             "overlinked_pages": overlinked,
             "link_sinks": link_sinks,
             "top_pages_by_inbound": top_pages,
-            "link_graph": {k: v for k, v in self.link_graph.items()},
-            "page_metrics": {k: asdict(v) for k, v in self.metrics.items()}
+            "link_graph": self.link_graph,
+            # PageMetrics are serialized directly by save_json, no asdict() copies
+            "page_metrics": dict(self.metrics)
         }
 
 
@@ -401,6 +481,8 @@ def main():
     parser.add_argument("--underlinked", type=int, default=3, help="Under-linked threshold")
     parser.add_argument("--overlinked", type=int, default=50, help="Over-linked threshold")
     parser.add_argument("--exclude", nargs="+", help="Paths to exclude")
+    parser.add_argument("--accurate", action="store_true",
+                        help="Use a full HTML parser even when selectolax/lxml are unavailable")
 
     args = parser.parse_args()
 
@@ -428,7 +510,8 @@ def main():
         underlinked_threshold=underlinked_threshold,
         overlinked_threshold=overlinked_threshold,
         sink_min_inbound=sink_min_inbound,
-        sink_max_outbound=sink_max_outbound
+        sink_max_outbound=sink_max_outbound,
+        accurate=args.accurate
     )
 
     # Output JSON
@@ -4,20 +4,40 @@ Outbound Links Analyzer
 Extracts and categorizes all external links from static site
 """
 
+import os
+import re
 import sys
-import json
 import argparse
 from pathlib import Path
 from urllib.parse import urlparse
 from collections import defaultdict, Counter
-from glob import glob
-
-from bs4 import BeautifulSoup
 
 # Add shared modules to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "shared"))
 from config_loader import load_json_config
-from utils import save_json, timestamp
+from utils import stream_json, print_json, timestamp
+
+from dist_scanner import scan_dist, prefix_length
+
+# Link type per domain; subdomains match through their parent domain
+LINK_TYPES_BY_DOMAIN = {
+    'twitter.com': 'Social Media - Twitter/X',
+    'x.com': 'Social Media - Twitter/X',
+    'facebook.com': 'Social Media - Facebook',
+    'linkedin.com': 'Social Media - LinkedIn',
+    'instagram.com': 'Social Media - Instagram',
+    'youtube.com': 'Social Media - YouTube',
+    'youtu.be': 'Social Media - YouTube',
+    'amazon.com': 'Amazon',
+    'a.co': 'Amazon',
+    'apple.com': 'App Store',
+    'play.google.com': 'Google Play Store',
+    'github.com': 'GitHub',
+    'medium.com': 'Medium',
+    'gumroad.com': 'Gumroad',
+    'substack.com': 'Substack',
+    'wikipedia.org': 'Wikipedia',
+}
 
 
 class OutboundLinksAnalyzer:
@@ -26,141 +46,148 @@ class OutboundLinksAnalyzer:
     def __init__(self, dist_path: Path, internal_domains: list[str]):
         self.dist_path = dist_path
         self.internal_domains = [d.lower() for d in internal_domains]
-        self.outbound_links: dict[str, list[str]] = defaultdict(list)
+        # Pages containing each link; repeats on a page are counted in link_counts
+        self.outbound_links: dict[str, set[str]] = defaultdict(set)
         self.link_counts: Counter = Counter()
-        self.domains: dict[str, list[str]] = defaultdict(list)
+        self.domains: dict[str, set[str]] = defaultdict(set)
         self.link_types: dict[str, str] = {}
+        self.files_analyzed: int = 0
+        self._prefix_len = prefix_length(dist_path)
+        # One alternation finds any internal domain in a single C-level scan;
+        # matching case-insensitively saves lowercasing every href first
+        self._internal_re = (
+            re.compile('|'.join(map(re.escape, self.internal_domains)), re.IGNORECASE)
+            if self.internal_domains else None
+        )
+        # href -> is_outbound_link(href); nav/footer links repeat on every page
+        self._outbound_cache: dict[str, bool] = {}
 
     def is_outbound_link(self, href: str) -> bool:
         """Determine if a link is outbound"""
-        if not href or href.strip() == '':
+        href = href.strip()
+        if not href:
             return False
 
-        href = href.strip().lower()
+        # Skip anchors and relative links
+        if href.startswith(('#', '/')):
+            return False
 
-        # Skip anchors, javascript, and relative links
-        if href.startswith('#') or href.startswith('javascript:') or href.startswith('/'):
+        # Skip javascript: in any case, lowering only the scheme's 11 characters
+        if href[:11].lower() == 'javascript:':
             return False
 
         # Skip internal domains
-        for domain in self.internal_domains:
-            if domain in href:
-                return False
+        if self._internal_re is not None and self._internal_re.search(href):
+            return False
 
         return True
 
-    def classify_link_type(self, url: str) -> str:
-        """Classify the type of outbound link"""
-        url_lower = url.lower()
-
-        try:
-            domain = urlparse(url).netloc.lower()
-        except:
-            domain = ""
-
+    def classify_link_type(self, url: str, netloc: str | None = None) -> str:
+        """Classify the type of outbound link (pass netloc to skip re-parsing url)"""
         if url.startswith('mailto:'):
             return 'Email'
         elif url.startswith('tel:'):
             return 'Phone'
-        elif 'twitter.com' in domain or 'x.com' in domain:
-            return 'Social Media - Twitter/X'
-        elif 'facebook.com' in domain:
-            return 'Social Media - Facebook'
-        elif 'linkedin.com' in domain:
-            return 'Social Media - LinkedIn'
-        elif 'instagram.com' in domain:
-            return 'Social Media - Instagram'
-        elif 'youtube.com' in domain or 'youtu.be' in domain:
-            return 'Social Media - YouTube'
-        elif 'amazon.com' in domain or 'amazon.' in domain or 'a.co' in domain:
-            return 'Amazon'
-        elif 'apps.apple.com' in domain or 'apple.com' in domain:
-            return 'App Store'
-        elif 'play.google.com' in domain:
-            return 'Google Play Store'
-        elif 'github.com' in domain:
-            return 'GitHub'
-        elif 'medium.com' in domain:
-            return 'Medium'
-        elif 'gumroad.com' in domain:
-            return 'Gumroad'
-        elif 'substack.com' in domain:
-            return 'Substack'
-        elif 'wikipedia.org' in domain:
-            return 'Wikipedia'
-        else:
-            return 'External Website'
-
-    def extract_links_from_file(self, file_path: Path) -> list[str]:
-        """Extract all outbound links from HTML file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-
-            soup = BeautifulSoup(content, 'html.parser')
-            links = []
-
-            for a_tag in soup.find_all('a', href=True):
-                href = a_tag['href']
-                if self.is_outbound_link(href):
-                    links.append(href)
-
-            return links
-
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}", file=sys.stderr)
-            return []
-
-    def get_relative_path(self, file_path: Path) -> str:
-        """Get relative path from dist folder"""
-        return str(file_path.relative_to(self.dist_path))
-
-    def analyze(self) -> dict:
-        """Analyze all HTML files"""
-        html_files = list(self.dist_path.glob('**/*.html'))
-        print(f"Found {len(html_files)} HTML files to analyze...")
 
-        for i, file_path in enumerate(html_files, 1):
-            links = self.extract_links_from_file(file_path)
-            relative_path = self.get_relative_path(file_path)
-
-            for link in links:
-                self.outbound_links[link].append(relative_path)
-                self.link_counts[link] += 1
-
-                if link not in self.link_types:
-                    self.link_types[link] = self.classify_link_type(link)
-
-                try:
-                    domain = urlparse(link).netloc
-                    if domain:
-                        if link not in self.domains[domain]:
-                            self.domains[domain].append(link)
-                except:
-                    if ':' in link:
-                        protocol = link.split(':')[0]
-                        if link not in self.domains[f"{protocol}:"]:
-                            self.domains[f"{protocol}:"].append(link)
-
-            if i % 100 == 0:
-                print(f"Processed {i}/{len(html_files)} files...")
-
-        print(f"Analysis complete. Found {len(self.link_counts)} unique outbound links.")
+        if netloc is None:
+            try:
+                netloc = urlparse(url).netloc
+            except:
+                netloc = ""
+
+        # Drop credentials and port, then try the host and each parent domain
+        # (www.twitter.com -> twitter.com -> com) against the lookup table
+        host = netloc.lower().rpartition('@')[2].partition(':')[0]
+        while host:
+            link_type = LINK_TYPES_BY_DOMAIN.get(host)
+            if link_type:
+                return link_type
+            # Amazon runs a storefront per country TLD (amazon.de, amazon.co.uk, ...)
+            if host.startswith('amazon.'):
+                return 'Amazon'
+            host = host.partition('.')[2]
+
+        return 'External Website'
+
+    def extract_links(self, hrefs: list[str]) -> list[str]:
+        """Extract all outbound links from a page's hrefs"""
+        cache = self._outbound_cache
+        links = []
+        for href in hrefs:
+            outbound = cache.get(href)
+            if outbound is None:
+                outbound = cache[href] = self.is_outbound_link(href)
+            if outbound:
+                links.append(href)
+        return links
+
+    def get_relative_path(self, file_path: str) -> str:
+        """Get relative path from dist folder"""
+        return os.fspath(file_path)[self._prefix_len:]
+
+    def ingest(self, file_path: str, hrefs: list[str]) -> None:
+        """Add the links of one scanned HTML file"""
+        self.files_analyzed += 1
+        links = self.extract_links(hrefs)
+        relative_path = self.get_relative_path(file_path)
+
+        # Local names skip the attribute lookups on every link occurrence
+        outbound_links = self.outbound_links
+        link_counts = self.link_counts
+        link_types = self.link_types
+        domains = self.domains
+
+        # Counting the page in one go runs the per-occurrence loop in C; the
+        # Counter also drops repeats while keeping first-seen order
+        page_counts = Counter(links)
+        link_counts.update(page_counts)
+
+        for link in page_counts:
+            outbound_links[link].add(relative_path)
+
+            # Type and domain depend only on the URL, so parse it once on first sight
+            if link in link_types:
+                continue
+
+            try:
+                parsed = urlparse(link)
+            except:
+                parsed = None
+            link_types[link] = self.classify_link_type(link, parsed.netloc if parsed is not None else "")
+
+            if parsed is not None:
+                domain = parsed.netloc
+                if domain:
+                    domains[domain].add(link)
+            elif ':' in link:
+                protocol = link.split(':')[0]
+                domains[f"{protocol}:"].add(link)
+
+    def get_results(self) -> dict:
+        """Build results from all ingested files"""
+        print(f"Analysis complete. Found {len(self.link_counts)} unique outbound links.", file=sys.stderr)
 
         return {
             "metadata": {
                 "analyzed_at": timestamp(),
-                "files_analyzed": len(html_files),
+                "files_analyzed": self.files_analyzed,
                 "unique_links": len(self.link_counts),
                 "unique_domains": len(self.domains),
                 "total_link_occurrences": sum(self.link_counts.values())
             },
-            "outbound_links": dict(self.outbound_links),
-            "link_counts": dict(self.link_counts),
-            "domains": {k: list(set(v)) for k, v in self.domains.items()},
+            "outbound_links": {k: sorted(v) for k, v in self.outbound_links.items()},
+            # Counter is a dict subclass; both JSON encoders take it as is
+            "link_counts": self.link_counts,
+            "domains": {k: sorted(v) for k, v in self.domains.items()},
             "link_types": self.link_types
         }
 
+    def analyze(self, accurate: bool = False, quiet: bool = False) -> dict:
+        """Analyze all HTML files"""
+        for file_path, hrefs, _ in scan_dist(self.dist_path, accurate=accurate, quiet=quiet):
+            self.ingest(file_path, hrefs)
+        return self.get_results()
+
 
 def main():
     parser = argparse.ArgumentParser(description="Outbound Links Analyzer")
@@ -168,6 +195,10 @@ def main():
     parser.add_argument("--config", help="Path to config.json")
     parser.add_argument("--output", "-o", help="Output file path")
     parser.add_argument("--domains", nargs="+", help="Internal domains to exclude")
+    parser.add_argument("--accurate", action="store_true",
+                        help="Use a full HTML parser even when selectolax/lxml are unavailable")
+    parser.add_argument("--quiet", "-q", action="store_true",
+                        help="Don't report scan progress on stderr")
 
     args = parser.parse_args()
 
@@ -193,15 +224,15 @@ def main():
 
     # Run analysis
     analyzer = OutboundLinksAnalyzer(dist_path, internal_domains)
-    results = analyzer.analyze()
+    results = analyzer.analyze(accurate=args.accurate, quiet=args.quiet)
 
     # Output
     if args.output:
         output_path = Path(args.output)
-        save_json(results, output_path)
+        stream_json(results, output_path)
         print(f"\nResults saved to: {output_path}")
     else:
-        print(json.dumps(results, indent=2))
+        print_json(results)
 
     # Print summary
     meta = results["metadata"]